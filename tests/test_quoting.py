@@ -101,6 +101,23 @@ def test_quote_ignore_broken_unicode(quoter: type[_Quoter]) -> None:
     assert quoter()(s) == s
 
 
+def test_quote_ignore_broken_unicode_inside_percent_encoded(
+    quoter: type[_Quoter],
+) -> None:
+    assert quoter()("%\udcf441é") == "A%C3%A9"
+    assert quoter()("%2\udcf40") == "%20"
+    assert quoter()("a%2\udcf40b") == "a%20b"
+    assert quoter()("x\udcf4") == "x"
+
+
+@pytest.mark.parametrize(("safe", "protected"), (("é", ""), ("", "é"), ("/é", "/")))
+def test_quote_non_ascii_safe(
+    quoter: type[_Quoter], safe: str, protected: str
+) -> None:
+    with pytest.raises(ValueError, match="Only safe symbols with ORD < 128"):
+        quoter(safe=safe, protected=protected)("/path")
+
+
 def test_unquote_to_bytes(unquoter: type[_Unquoter]) -> None:
     assert unquoter()("abc%20def") == "abc def"
     assert unquoter()("") == ""
@@ -457,6 +474,12 @@ def test_unquote_plus_to_space_unsafe(unquoter: type[_Unquoter]) -> None:
     assert unquoter(unsafe="+", qs=True)("a+b") == "a+b"
 
 
+def test_unquote_plus_to_space_between_literal_runs(
+    unquoter: type[_Unquoter],
+) -> None:
+    assert unquoter(qs=True)("path%D0/x+y%2Fé+z") == "path%D0/x y/é z"
+
+
 def test_unquote_multiple_unsafe(unquoter: type[_Unquoter]) -> None:
     assert unquoter(unsafe="!@#$")("a!@#$b") == "a%21%40%23%24b"
 
@@ -487,6 +510,30 @@ def test_quote_fastpath_pct(quoter: type[_Quoter]) -> None:
     assert s1 is s2
 
 
+def test_unquote_fastpath(unquoter: type[_Unquoter]) -> None:
+    s1 = "/plain/path"
+    assert unquoter()(s1) is s1
+    assert unquoter(qs=True)(s1) is s1
+
+
+def test_unquote_fastpath_unsafe(unquoter: type[_Unquoter]) -> None:
+    s1 = "/plain/path"
+    assert unquoter(unsafe="+")(s1) is s1
+    assert unquoter(unsafe="+", ignore="/%")(s1) is s1
+    s2 = "a=1&b=2"
+    assert unquoter(unsafe="!@#$", qs=True)(s2) is s2
+    s3 = "/pa th/шлях"
+    assert unquoter(unsafe="+", plus=True)(s3) is s3
+
+
+def test_quote_safe_prefix(quoter: type[_Quoter]) -> None:
+    assert quoter(safe="/")("/path/to/some/file name") == "/path/to/some/file%20name"
+    assert quoter(safe="/", qs=True)("/path/to/some/file name") == (
+        "/path/to/some/file+name"
+    )
+    assert quoter()("abcdefghij%2fk") == "abcdefghij%2Fk"
+
+
 def test_quote_very_large_string(quoter: type[_Quoter]) -> None:
     # more than 8 KiB
     s = "abcфух%30%0a" * 1024
@@ -3,19 +3,25 @@
 from cpython.exc cimport PyErr_NoMemory
 from cpython.mem cimport PyMem_Free, PyMem_Malloc, PyMem_Realloc
 from cpython.unicode cimport (
+    PyUnicode_1BYTE_DATA,
     PyUnicode_DATA,
-    PyUnicode_DecodeASCII,
     PyUnicode_DecodeUTF8Stateful,
+    PyUnicode_FindChar,
     PyUnicode_GET_LENGTH,
     PyUnicode_KIND,
+    PyUnicode_New,
     PyUnicode_READ,
 )
-from libc.stdint cimport uint8_t, uint64_t
-from libc.string cimport memcpy, memset
+from libc.stdint cimport int8_t, uint8_t
+from libc.string cimport memcmp, memcpy, memset
 
 from string import ascii_letters, digits
 
 
+cdef extern from "Python.h":
+    bint PyUnicode_IS_ASCII(object o)
+
+
 cdef str GEN_DELIMS = ":/?#[]@"
 cdef str SUB_DELIMS_WITHOUT_QS = "!$'()*,"
 cdef str SUB_DELIMS = SUB_DELIMS_WITHOUT_QS + '+?=;'
@@ -33,15 +39,31 @@ cdef inline Py_UCS4 _to_hex(uint8_t v) noexcept:
         return <Py_UCS4>(v+0x41-10)  # ord('A') == 0x41
 
 
+# "%XX" escape sequences for every byte value
+cdef char PCT_TABLE[256][3]
+
+for i in range(256):
+    PCT_TABLE[i][0] = b'%'
+    PCT_TABLE[i][1] = <char>_to_hex(<uint8_t>i >> 4)
+    PCT_TABLE[i][2] = <char>_to_hex(<uint8_t>i & 0x0f)
+
+
+# Value of every hex digit, -1 for bytes that are not hex digits
+cdef int8_t HEX_TABLE[256]
+
+for i in range(256):
+    HEX_TABLE[i] = -1
+for i in range(10):
+    HEX_TABLE[0x30 + i] = i  # ord('0') == 0x30
+for i in range(6):
+    HEX_TABLE[0x41 + i] = 10 + i  # ord('A') == 0x41
+    HEX_TABLE[0x61 + i] = 10 + i  # ord('a') == 0x61
+
+
 cdef inline int _from_hex(Py_UCS4 v) noexcept:
-    if '0' <= v <= '9':
-        return <int>(v) - 0x30  # ord('0') == 0x30
-    elif 'A' <= v <= 'F':
-        return <int>(v) - 0x41 + 10  # ord('A') == 0x41
-    elif 'a' <= v <= 'f':
-        return <int>(v) - 0x61 + 10  # ord('a') == 0x61
-    else:
-        return -1
+    if v < 256:
+        return HEX_TABLE[v]
+    return -1
 
 
 cdef inline int _is_lower_hex(Py_UCS4 v) noexcept:
@@ -50,24 +72,17 @@ cdef inline int _is_lower_hex(Py_UCS4 v) noexcept:
 
 cdef inline long _restore_ch(Py_UCS4 d1, Py_UCS4 d2):
     cdef int digit1 = _from_hex(d1)
-    if digit1 < 0:
-        return -1
     cdef int digit2 = _from_hex(d2)
-    if digit2 < 0:
+    if (digit1 | digit2) < 0:
         return -1
     return digit1 << 4 | digit2
 
 
-cdef uint8_t ALLOWED_TABLE[16]
-cdef uint8_t ALLOWED_NOTQS_TABLE[16]
-
-
-cdef inline bint bit_at(uint8_t array[], uint64_t ch) noexcept:
-    return array[ch >> 3] & (1 << (ch & 7))
-
-
-cdef inline void set_bit(uint8_t array[], uint64_t ch) noexcept:
-    array[ch >> 3] |= (1 << (ch & 7))
+# Byte-per-character classification tables: one load classifies a
+# character, with no shift/mask work in the hot loops.  They are
+# indexed by any byte value, entries for non-ASCII bytes stay zero.
+cdef uint8_t ALLOWED_TABLE[256]
+cdef uint8_t ALLOWED_NOTQS_TABLE[256]
 
 
 memset(ALLOWED_TABLE, 0, sizeof(ALLOWED_TABLE))
@@ -75,10 +90,33 @@ memset(ALLOWED_NOTQS_TABLE, 0, sizeof(ALLOWED_NOTQS_TABLE))
 
 for i in range(128):
     if chr(i) in ALLOWED:
-        set_bit(ALLOWED_TABLE, i)
-        set_bit(ALLOWED_NOTQS_TABLE, i)
+        ALLOWED_TABLE[i] = 1
+        ALLOWED_NOTQS_TABLE[i] = 1
     if chr(i) in QS:
-        set_bit(ALLOWED_NOTQS_TABLE, i)
+        ALLOWED_NOTQS_TABLE[i] = 1
+
+
+cdef inline Py_ssize_t _ascii_safe_prefix(
+    const uint8_t *table, const uint8_t *data, Py_ssize_t length
+) noexcept:
+    # Walk the raw ASCII buffer directly, avoiding the per character
+    # kind dispatch of PyUnicode_READ(), and fold eight characters
+    # into a single branch so clean input runs without early exits.
+    # Returns the length of the leading run of safe characters.
+    cdef Py_ssize_t idx = 0
+    while idx + 8 <= length:
+        if not (
+            table[data[idx]] & table[data[idx + 1]] &
+            table[data[idx + 2]] & table[data[idx + 3]] &
+            table[data[idx + 4]] & table[data[idx + 5]] &
+            table[data[idx + 6]] & table[data[idx + 7]]
+        ):
+            break
+        idx += 8
+    while idx < length and table[data[idx]]:
+        idx += 1
+    return idx
+
 
 # ----------------- writer ---------------------------
 
@@ -87,7 +125,6 @@ cdef struct Writer:
     bint heap_allocated_buf
     Py_ssize_t size
     Py_ssize_t pos
-    bint changed
 
 
 cdef inline void _init_writer(Writer* writer, char* buf):
@@ -95,7 +132,6 @@ cdef inline void _init_writer(Writer* writer, char* buf):
     writer.heap_allocated_buf = False
     writer.size = BUF_SIZE
     writer.pos = 0
-    writer.changed = 0
 
 
 cdef inline void _release_writer(Writer* writer):
@@ -103,73 +139,31 @@ cdef inline void _release_writer(Writer* writer):
         PyMem_Free(writer.buf)
 
 
-cdef inline int _write_char(Writer* writer, Py_UCS4 ch, bint changed):
+cdef inline int _reserve(Writer* writer, Py_ssize_t extra):
     cdef char * buf
     cdef Py_ssize_t size
 
-    if writer.pos == writer.size:
-        # reallocate
-        size = writer.size + BUF_SIZE
-        if not writer.heap_allocated_buf:
-            buf = <char*>PyMem_Malloc(size)
-            if buf == NULL:
-                PyErr_NoMemory()
-                return -1
-            memcpy(buf, writer.buf, writer.size)
-            writer.heap_allocated_buf = True
-        else:
-            buf = <char*>PyMem_Realloc(writer.buf, size)
-            if buf == NULL:
-                PyErr_NoMemory()
-                return -1
-        writer.buf = buf
-        writer.size = size
-    writer.buf[writer.pos] = <char>ch
-    writer.pos += 1
-    writer.changed |= changed
-    return 0
-
-
-cdef inline int _write_pct(Writer* writer, uint8_t ch, bint changed):
-    if _write_char(writer, '%', changed) < 0:
-        return -1
-    if _write_char(writer, _to_hex(<uint8_t>ch >> 4), changed) < 0:
-        return -1
-    return _write_char(writer, _to_hex(<uint8_t>ch & 0x0f), changed)
-
-
-cdef inline int _write_utf8(Writer* writer, Py_UCS4 symbol):
-    cdef uint64_t utf = <uint64_t> symbol
-
-    if utf < 0x80:
-        return _write_pct(writer, <uint8_t>utf, True)
-    elif utf < 0x800:
-        if _write_pct(writer, <uint8_t>(0xc0 | (utf >> 6)), True) < 0:
-            return -1
-        return _write_pct(writer,  <uint8_t>(0x80 | (utf & 0x3f)), True)
-    elif 0xD800 <= utf <= 0xDFFF:
-        # surogate pair, ignored
+    if writer.pos + extra <= writer.size:
         return 0
-    elif utf < 0x10000:
-        if _write_pct(writer, <uint8_t>(0xe0 | (utf >> 12)), True) < 0:
-            return -1
-        if _write_pct(writer, <uint8_t>(0x80 | ((utf >> 6) & 0x3f)),
-                      True) < 0:
+    # reallocate
+    size = writer.size + BUF_SIZE
+    if size < writer.pos + extra:
+        size = writer.pos + extra
+    if not writer.heap_allocated_buf:
+        buf = <char*>PyMem_Malloc(size)
+        if buf == NULL:
+            PyErr_NoMemory()
             return -1
-        return _write_pct(writer, <uint8_t>(0x80 | (utf & 0x3f)), True)
-    elif utf > 0x10FFFF:
-        # symbol is too large
-        return 0
+        memcpy(buf, writer.buf, writer.pos)
+        writer.heap_allocated_buf = True
     else:
-        if _write_pct(writer,  <uint8_t>(0xf0 | (utf >> 18)), True) < 0:
-            return -1
-        if _write_pct(writer,  <uint8_t>(0x80 | ((utf >> 12) & 0x3f)),
-                      True) < 0:
+        buf = <char*>PyMem_Realloc(writer.buf, size)
+        if buf == NULL:
+            PyErr_NoMemory()
             return -1
-        if _write_pct(writer,  <uint8_t>(0x80 | ((utf >> 6) & 0x3f)),
-                      True) < 0:
-            return -1
-        return _write_pct(writer, <uint8_t>(0x80 | (utf & 0x3f)), True)
+    writer.buf = buf
+    writer.size = size
+    return 0
 
 
 # --------------------- end writer --------------------------
@@ -179,8 +173,11 @@ cdef class _Quoter:
     cdef bint _qs
     cdef bint _requote
 
-    cdef uint8_t _safe_table[16]
-    cdef uint8_t _protected_table[16]
+    cdef uint8_t _safe_table[256]
+    cdef uint8_t _protected_table[256]
+    # safe characters that are copied verbatim
+    cdef uint8_t _plain_table[256]
+    cdef bint _safe_is_plain
 
     def __init__(
             self, *, str safe='', str protected='', bint qs=False, bint requote=True,
@@ -201,14 +198,23 @@ cdef class _Quoter:
         for ch in safe:
             if ord(ch) > 127:
                 raise ValueError("Only safe symbols with ORD < 128 are allowed")
-            set_bit(self._safe_table, ch)
+            self._safe_table[ch] = 1
 
         memset(self._protected_table, 0, sizeof(self._protected_table))
         for ch in protected:
             if ord(ch) > 127:
                 raise ValueError("Only safe symbols with ORD < 128 are allowed")
-            set_bit(self._safe_table, ch)
-            set_bit(self._protected_table, ch)
+            self._safe_table[ch] = 1
+            self._protected_table[ch] = 1
+
+        memcpy(self._plain_table, self._safe_table, sizeof(self._plain_table))
+        if self._requote:
+            self._plain_table[ord('%')] = 0
+        if self._qs:
+            self._plain_table[ord(' ')] = 0
+        self._safe_is_plain = memcmp(
+            self._plain_table, self._safe_table, sizeof(self._plain_table)
+        ) == 0
 
     def __call__(self, val):
         if val is None:
@@ -223,92 +229,149 @@ cdef class _Quoter:
 
     cdef str _do_quote_or_skip(self, str val):
         cdef char[BUF_SIZE] buffer
-        cdef Py_UCS4 ch
         cdef Py_ssize_t length = PyUnicode_GET_LENGTH(val)
-        cdef Py_ssize_t idx = length
-        cdef bint must_quote = 0
         cdef Writer writer
-        cdef int kind = PyUnicode_KIND(val)
-        cdef const void *data = PyUnicode_DATA(val)
-
-        # If everything in the string is in the safe
-        # table and all ASCII, we can skip quoting
-        while idx:
-            idx -= 1
-            ch = PyUnicode_READ(kind, data, idx)
-            if ch >= 128 or not bit_at(self._safe_table, ch):
-                must_quote = 1
-                break
-
-        if not must_quote:
-            return val
+        cdef bytes encoded
+        cdef const uint8_t *data
+        cdef Py_ssize_t start = 0
+        cdef bint changed = False
+
+        if PyUnicode_IS_ASCII(val):
+            data = <const uint8_t *>PyUnicode_1BYTE_DATA(val)
+            start = _ascii_safe_prefix(self._safe_table, data, length)
+            # If everything in the string is in the safe
+            # table, we can skip quoting
+            if start == length:
+                return val
+            # Otherwise the prefix checked above is copied verbatim,
+            # unless '%' or ' ' among safe characters need rewriting
+            if not self._safe_is_plain:
+                start = 0
+        else:
+            # Non-ASCII strings always need quoting. Encode them once and
+            # quote the UTF-8 bytes, percent-encoding is defined byte-wise.
+            # Lone surrogates are ignored.
+            encoded = val.encode("utf8", "ignore")
+            data = <const uint8_t *><const char *>encoded
+            length = len(encoded)
+            # The ASCII output can never equal the non-ASCII input
+            changed = True
 
         _init_writer(&writer, &buffer[0])
         try:
-            return self._do_quote(<str>val, length, kind, data, &writer)
+            return self._do_quote(<str>val, data, length, start, changed, &writer)
         finally:
             _release_writer(&writer)
 
     cdef str _do_quote(
         self,
         str val,
+        const uint8_t *data,
         Py_ssize_t length,
-        int kind,
-        const void *data,
+        Py_ssize_t idx,
+        bint changed,
         Writer *writer
     ):
-        cdef Py_UCS4 ch
+        cdef uint8_t ch
         cdef long chl
-        cdef int changed
-        cdef Py_ssize_t idx = 0
+        cdef Py_ssize_t run_end
+        cdef Py_ssize_t chunk_end = idx
+        cdef char *buf
+        cdef Py_ssize_t pos
+        cdef str ret
+        # The configuration is fixed per instance; keep it in locals so
+        # that stores into the output buffer do not force reloads of it
+        cdef const uint8_t *plain_table = self._plain_table
+        cdef const uint8_t *safe_table = self._safe_table
+        cdef const uint8_t *protected_table = self._protected_table
+        cdef bint requote = self._requote
+        cdef bint qs = self._qs
+
+        # Data before idx is already known to be plain
+        if _reserve(writer, idx) < 0:
+            raise
+        buf = writer.buf
+        pos = writer.pos
+        memcpy(buf + pos, data, idx)
+        pos += idx
 
         while idx < length:
-            ch = PyUnicode_READ(kind, data, idx)
+            if idx >= chunk_end:
+                # Every byte takes at most three bytes ("%XX"). Reserve the
+                # worst case for the next chunk of input, the loop then writes
+                # unchecked while large inputs still grow the buffer gradually.
+                # A requoted "%XX" may run two bytes past the chunk end.
+                chunk_end = idx + BUF_SIZE // 4
+                if chunk_end > length:
+                    chunk_end = length
+                writer.pos = pos
+                if _reserve(writer, 3 * (chunk_end - idx + 2)) < 0:
+                    raise
+                buf = writer.buf
+            # Copy the whole run of plain characters at once,
+            # bytes of multi-byte UTF-8 sequences are never plain
+            run_end = idx
+            while run_end < chunk_end and plain_table[data[run_end]]:
+                run_end += 1
+            if run_end != idx:
+                memcpy(buf + pos, data + idx, run_end - idx)
+                pos += run_end - idx
+                idx = run_end
+                if idx == chunk_end:
+                    continue
+            ch = data[idx]
             idx += 1
-            if ch == '%' and self._requote and idx <= length - 2:
-                chl = _restore_ch(
-                    PyUnicode_READ(kind, data, idx),
-                    PyUnicode_READ(kind, data, idx + 1)
-                )
+            if ch == '%' and requote and idx <= length - 2:
+                chl = _restore_ch(data[idx], data[idx + 1])
                 if chl != -1:
-                    ch = <Py_UCS4>chl
+                    ch = <uint8_t>chl
                     idx += 2
                     if ch < 128:
-                        if bit_at(self._protected_table, ch):
-                            if _write_pct(writer, ch, True) < 0:
-                                raise
+                        if protected_table[ch]:
+                            memcpy(buf + pos, PCT_TABLE[ch], 3)
+                            pos += 3
+                            changed = True
                             continue
 
-                        if bit_at(self._safe_table, ch):
-                            if _write_char(writer, ch, True) < 0:
-                                raise
+                        if safe_table[ch]:
+                            buf[pos] = <char>ch
+                            pos += 1
+                            changed = True
                             continue
 
-                    changed = (_is_lower_hex(PyUnicode_READ(kind, data, idx - 2)) or
-                               _is_lower_hex(PyUnicode_READ(kind, data, idx - 1)))
-                    if _write_pct(writer, ch, changed) < 0:
-                        raise
+                    if _is_lower_hex(data[idx - 2]) or _is_lower_hex(data[idx - 1]):
+                        changed = True
+                    memcpy(buf + pos, PCT_TABLE[ch], 3)
+                    pos += 3
                     continue
                 else:
                     ch = '%'
 
-            if self._write(writer, ch) < 0:
-                raise
+            if qs and ch == ' ':
+                buf[pos] = b'+'
+                pos += 1
+                changed = True
+            elif safe_table[ch]:
+                buf[pos] = <char>ch
+                pos += 1
+            else:
+                memcpy(buf + pos, PCT_TABLE[ch], 3)
+                pos += 3
+                changed = True
 
-        if not writer.changed:
+        if not changed:
             return val
-        else:
-            return PyUnicode_DecodeASCII(writer.buf, writer.pos, "strict")
-
-    cdef inline int _write(self, Writer *writer, Py_UCS4 ch):
-        if self._qs:
-            if ch == ' ':
-                return _write_char(writer, '+', True)
+        # The output is ASCII by construction, copy it straight into
+        # a new string without decoding and validating it again
+        ret = PyUnicode_New(pos, 127)
+        memcpy(PyUnicode_1BYTE_DATA(ret), buf, pos)
+        return ret
 
-        if ch < 128 and bit_at(self._safe_table, ch):
-            return _write_char(writer, ch, False)
 
-        return _write_utf8(writer, ch)
+# Quoters are stateless between calls, so every _Unquoter
+# shares the same ones for re-encoding decoded characters.
+cdef _Quoter _QUOTER = _Quoter()
+cdef _Quoter _QS_QUOTER = _Quoter(qs=True)
 
 
 cdef class _Unquoter:
@@ -322,8 +385,13 @@ cdef class _Unquoter:
     cdef bint _plus  # to match urllib.parse.unquote_plus
     cdef _Quoter _quoter
     cdef _Quoter _qs_quoter
+    # ASCII characters that are copied verbatim,
+    # non-ASCII characters always are
+    cdef uint8_t _literal_table[128]
 
     def __init__(self, *, ignore="", unsafe="", qs=False, plus=False):
+        cdef Py_ssize_t i
+
         self._ignore = ignore
         self._has_ignore = bool(self._ignore)
         self._unsafe = unsafe
@@ -333,8 +401,16 @@ cdef class _Unquoter:
         self._unsafe_bytes_char = self._unsafe_bytes
         self._qs = qs
         self._plus = plus
-        self._quoter = _Quoter()
-        self._qs_quoter = _Quoter(qs=True)
+        self._quoter = _QUOTER
+        self._qs_quoter = _QS_QUOTER
+
+        memset(self._literal_table, 1, sizeof(self._literal_table))
+        self._literal_table[ord('%')] = 0
+        if self._qs or self._plus:
+            self._literal_table[ord('+')] = 0
+        for i in range(self._unsafe_bytes_len):
+            if self._unsafe_bytes_char[i] < 128:
+                self._literal_table[self._unsafe_bytes_char[i]] = 0
 
     def __call__(self, val):
         if val is None:
@@ -352,19 +428,44 @@ cdef class _Unquoter:
         if length == 0:
             return val
 
+        cdef int kind = PyUnicode_KIND(val)
+        cdef const void *data = PyUnicode_DATA(val)
+
+        # Fast path: nothing to decode or replace,
+        # PyUnicode_FindChar() boils down to memchr()
+        if not self._unsafe_bytes_len:
+            if (
+                PyUnicode_FindChar(val, '%', 0, length, 1) == -1 and
+                (
+                    (not self._qs and not self._plus) or
+                    PyUnicode_FindChar(val, '+', 0, length, 1) == -1
+                )
+            ):
+                return val
+        elif self._literal_run_end(kind, data, 0, length) == length:
+            return val
+
         cdef list ret = []
         cdef char buffer[4]
         cdef Py_ssize_t buflen = 0
         cdef Py_ssize_t consumed
         cdef str unquoted
+        cdef Py_UCS4 unquoted_ch
         cdef Py_UCS4 ch = 0
         cdef long chl = 0
         cdef Py_ssize_t idx = 0
         cdef Py_ssize_t start_pct
-        cdef int kind = PyUnicode_KIND(val)
-        cdef const void *data = PyUnicode_DATA(val)
+        cdef Py_ssize_t run_end
         cdef bint changed = 0
         while idx < length:
+            if not buflen:
+                # Append the whole run of literal characters as one slice
+                run_end = self._literal_run_end(kind, data, idx, length)
+                if run_end != idx:
+                    ret.append(val[idx:run_end])
+                    idx = run_end
+                    if idx == length:
+                        break
             ch = PyUnicode_READ(kind, data, idx)
             idx += 1
             if ch == '%' and idx <= length - 2:
@@ -399,10 +500,15 @@ cdef class _Unquoter:
                         continue
                     assert consumed == buflen
                     buflen = 0
-                    if self._qs and unquoted in '+=&;':
+                    # a complete UTF-8 sequence decodes to a single character
+                    unquoted_ch = unquoted[0]
+                    if self._qs and unquoted_ch in '+=&;':
                         ret.append(self._qs_quoter(unquoted))
                     elif (
-                        (self._unsafe_bytes_len and unquoted in self._unsafe) or
+                        (
+                            self._unsafe_bytes_len and
+                            self._is_char_unsafe(unquoted_ch)
+                        ) or
                         (self._has_ignore and unquoted in self._ignore)
                     ):
                         ret.append(self._quoter(unquoted))
@@ -430,10 +536,11 @@ cdef class _Unquoter:
 
             if self._unsafe_bytes_len and self._is_char_unsafe(ch):
                 changed = 1
+                # unsafe characters are ASCII, hex digits are not zero padded
                 ret.append('%')
-                h = hex(ord(ch)).upper()[2:]
-                for ch in h:
-                    ret.append(ch)
+                if ch >= 0x10:
+                    ret.append(_to_hex(<uint8_t>ch >> 4))
+                ret.append(_to_hex(<uint8_t>ch & 0x0f))
                 continue
 
             ret.append(ch)
@@ -446,7 +553,19 @@ cdef class _Unquoter:
 
         return ''.join(ret)
 
-    cdef inline bint _is_char_unsafe(self, Py_UCS4 ch):
+    cdef inline Py_ssize_t _literal_run_end(
+        self, int kind, const void *data, Py_ssize_t idx, Py_ssize_t length
+    ) noexcept:
+        cdef Py_UCS4 ch
+        while idx < length:
+            ch = PyUnicode_READ(kind, data, idx)
+            if ch < 128 and not self._literal_table[ch]:
+                break
+            idx += 1
+        return idx
+
+    cdef inline bint _is_char_unsafe(self, Py_UCS4 ch) noexcept:
+        cdef Py_ssize_t i
         for i in range(self._unsafe_bytes_len):
             if ch == self._unsafe_bytes_char[i]:
                 return True
@@ -1,10 +1,11 @@
 import codecs
 import re
-from string import ascii_letters, ascii_lowercase, digits
+from string import ascii_letters, digits
 from typing import Union, cast, overload
 
-BASCII_LOWERCASE = ascii_lowercase.encode("ascii")
-BPCT_ALLOWED = {f"%{i:02X}".encode("ascii") for i in range(256)}
+# "%XX" escape sequences for every byte value
+_BPCT = tuple(f"%{i:02X}".encode("ascii") for i in range(256))
+BPCT_ALLOWED = set(_BPCT)
 GEN_DELIMS = ":/?#[]@"
 SUB_DELIMS_WITHOUT_QS = "!$'()*,"
 SUB_DELIMS = SUB_DELIMS_WITHOUT_QS + "+&=;"
@@ -13,8 +14,8 @@ UNRESERVED = ascii_letters + digits + "-._~"
 ALLOWED = UNRESERVED + SUB_DELIMS_WITHOUT_QS
 
 
-_IS_HEX = re.compile(b"[A-Z0-9][A-Z0-9]")
-_IS_HEX_STR = re.compile("[A-Fa-f0-9][A-Fa-f0-9]")
+_IS_HEX = re.compile(b"[A-Fa-f0-9][A-Fa-f0-9]")
+_PCT_RUN = re.compile("(?:%[A-Fa-f0-9][A-Fa-f0-9])+")
 
 utf8_decoder = codecs.getincrementaldecoder("utf-8")
 
@@ -32,6 +33,28 @@ class _Quoter:
         self._protected = protected
         self._qs = qs
         self._requote = requote
+        # Only ASCII symbols can be safe. Unlike the C quoter, which rejects
+        # others on construction, the error is raised when quoting.
+        self._ascii_safe = (safe + protected).isascii()
+
+        safe += ALLOWED
+        if not qs:
+            safe += "+&=;"
+        safe += protected
+        bsafe = safe.encode("ascii", errors="ignore")
+        self._bsafe = bsafe
+        self._bprotected = protected.encode("ascii", errors="ignore")
+        # Bytes that are copied verbatim: "%" starts a requote sequence
+        # and " " becomes "+" in query strings even if marked as safe.
+        bplain = bsafe
+        if requote:
+            bplain = bplain.replace(b"%", b"")
+        if qs:
+            bplain = bplain.replace(b" ", b"")
+        self._bplain = bplain
+        not_plain = b"[^" + re.escape(bplain) + b"]"
+        self._find_not_plain = re.compile(not_plain).search
+        self._find_not_plain_str = re.compile(not_plain.decode("ascii")).search
 
     @overload
     def __call__(self, val: str) -> str: ...
@@ -44,63 +67,44 @@ class _Quoter:
             raise TypeError("Argument should be str")
         if not val:
             return ""
+        if not self._ascii_safe:
+            raise ValueError("Only safe symbols with ORD < 128 are allowed")
+        # Fast path: nothing to quote, requote or replace
+        if self._find_not_plain_str(val) is None:
+            return val
         bval = val.encode("utf8", errors="ignore")
         ret = bytearray()
-        pct = bytearray()
-        safe = self._safe
-        safe += ALLOWED
-        if not self._qs:
-            safe += "+&=;"
-        safe += self._protected
-        bsafe = safe.encode("ascii")
+        bsafe = self._bsafe
+        bprotected = self._bprotected
+        bplain = self._bplain
+        find_not_plain = self._find_not_plain
         idx = 0
         while idx < len(bval):
             ch = bval[idx]
+            if ch in bplain:
+                # Copy the whole run of plain bytes at once
+                match = find_not_plain(bval, idx + 1)
+                if match is None:
+                    ret += bval[idx:]
+                    break
+                end = match.start()
+                ret += bval[idx:end]
+                idx = end
+                ch = bval[idx]
             idx += 1
 
-            if pct:
-                if ch in BASCII_LOWERCASE:
-                    ch = ch - 32  # convert to uppercase
-                pct.append(ch)
-                if len(pct) == 3:  # pragma: no branch   # peephole optimizer
-                    buf = pct[1:]
-                    if not _IS_HEX.match(buf):
-                        ret.extend(b"%25")
-                        pct.clear()
-                        idx -= 2
-                        continue
-                    try:
-                        unquoted = chr(int(pct[1:].decode("ascii"), base=16))
-                    except ValueError:
-                        ret.extend(b"%25")
-                        pct.clear()
-                        idx -= 2
-                        continue
-
-                    if unquoted in self._protected:
-                        ret.extend(pct)
-                    elif unquoted in safe:
-                        ret.append(ord(unquoted))
-                    else:
-                        ret.extend(pct)
-                    pct.clear()
-
-                # special case, if we have only one char after "%"
-                elif len(pct) == 2 and idx == len(bval):
-                    ret.extend(b"%25")
-                    pct.clear()
-                    idx -= 1
-
-                continue
-
-            elif ch == ord("%") and self._requote:
-                pct.clear()
-                pct.append(ch)
-
-                # special case if "%" is last char
-                if idx == len(bval):
-                    ret.extend(b"%25")
-
+            if ch == ord("%") and self._requote:
+                # Only "%" followed by two hex digits is a percent-encoded
+                # octet, any other "%" is quoted itself
+                if not _IS_HEX.match(bval, idx):
+                    ret += b"%25"
+                    continue
+                unquoted = int(bval[idx : idx + 2], base=16)
+                idx += 2
+                if unquoted not in bprotected and unquoted in bsafe:
+                    ret.append(unquoted)
+                else:
+                    ret += _BPCT[unquoted]
                 continue
 
             if self._qs and ch == ord(" "):
@@ -110,7 +114,7 @@ class _Quoter:
                 ret.append(ch)
                 continue
 
-            ret.extend((f"%{ch:02X}").encode("ascii"))
+            ret += _BPCT[ch]
 
         ret2 = ret.decode("ascii")
         if ret2 == val:
@@ -118,6 +122,12 @@ class _Quoter:
         return ret2
 
 
+# Quoters are stateless between calls, so every _Unquoter
+# shares the same ones for re-encoding decoded characters.
+_QUOTER = _Quoter()
+_QS_QUOTER = _Quoter(qs=True)
+
+
 class _Unquoter:
     def __init__(
         self,
@@ -131,8 +141,37 @@ class _Unquoter:
         self._unsafe = unsafe
         self._qs = qs
         self._plus = plus  # to match urllib.parse.unquote_plus
-        self._quoter = _Quoter()
-        self._qs_quoter = _Quoter(qs=True)
+        self._quoter = _QUOTER
+        self._qs_quoter = _QS_QUOTER
+
+        # Translation tables applied with str.translate() to literal text
+        # and to decoded percent-escapes, ``None`` if there is nothing to do.
+        literal_table: dict[int, str] = {}
+        for ch in unsafe:
+            literal_table[ord(ch)] = "%" + hex(ord(ch)).upper()[2:]
+        if "+" in unsafe:
+            literal_table[ord("+")] = "+"
+        elif qs or plus:
+            literal_table[ord("+")] = " "
+        self._literal_table = literal_table or None
+        # "%" and the literal characters that are rewritten
+        self._find_special = re.compile(
+            "[%" + re.escape("".join(map(chr, literal_table))) + "]"
+        ).search
+
+        decoded_table: dict[int, str] = {}
+        for ch in unsafe + ignore:
+            to_add = self._quoter(ch)
+            if to_add is None:  # pragma: no cover
+                raise RuntimeError("Cannot quote None")
+            decoded_table[ord(ch)] = to_add
+        if qs:
+            for ch in "+=&;":
+                to_add = self._qs_quoter(ch)
+                if to_add is None:  # pragma: no cover
+                    raise RuntimeError("Cannot quote None")
+                decoded_table[ord(ch)] = to_add
+        self._decoded_table = decoded_table or None
 
     @overload
     def __call__(self, val: str) -> str: ...
@@ -145,69 +184,71 @@ class _Unquoter:
             raise TypeError("Argument should be str")
         if not val:
             return ""
-        decoder = cast(codecs.BufferedIncrementalDecoder, utf8_decoder())
+        # Fast path: nothing to decode or replace
+        if self._literal_table is None:
+            if "%" not in val:
+                return val
+        elif self._find_special(val) is None:
+            return val
+        literal_table = self._literal_table
         ret = []
         idx = 0
-        while idx < len(val):
-            ch = val[idx]
-            idx += 1
-            if ch == "%" and idx <= len(val) - 2:
-                pct = val[idx : idx + 2]
-                if _IS_HEX_STR.fullmatch(pct):
-                    b = bytes([int(pct, base=16)])
-                    idx += 2
-                    try:
-                        unquoted = decoder.decode(b)
-                    except UnicodeDecodeError:
-                        start_pct = idx - 3 - len(decoder.buffer) * 3
-                        ret.append(val[start_pct : idx - 3])
-                        decoder.reset()
-                        try:
-                            unquoted = decoder.decode(b)
-                        except UnicodeDecodeError:
-                            ret.append(val[idx - 3 : idx])
-                            continue
-                    if not unquoted:
-                        continue
-                    if self._qs and unquoted in "+=&;":
-                        to_add = self._qs_quoter(unquoted)
-                        if to_add is None:  # pragma: no cover
-                            raise RuntimeError("Cannot quote None")
-                        ret.append(to_add)
-                    elif unquoted in self._unsafe or unquoted in self._ignore:
-                        to_add = self._quoter(unquoted)
-                        if to_add is None:  # pragma: no cover
-                            raise RuntimeError("Cannot quote None")
-                        ret.append(to_add)
-                    else:
-                        ret.append(unquoted)
-                    continue
-
-            if decoder.buffer:
-                start_pct = idx - 1 - len(decoder.buffer) * 3
-                ret.append(val[start_pct : idx - 1])
-                decoder.reset()
+        # The text is split into literal runs and runs of consecutive
+        # percent-escapes by a precompiled regex; each run is then handled
+        # in bulk instead of walking the string character by character.
+        for match in _PCT_RUN.finditer(val):
+            start = match.start()
+            if start != idx:
+                literal = val[idx:start]
+                if literal_table is not None:
+                    literal = literal.translate(literal_table)
+                ret.append(literal)
+            ret.append(self._unquote_pct_run(match.group()))
+            idx = match.end()
+        if idx != len(val):
+            literal = val[idx:]
+            if literal_table is not None:
+                literal = literal.translate(literal_table)
+            ret.append(literal)
 
-            if ch == "+":
-                if (not self._qs and not self._plus) or ch in self._unsafe:
-                    ret.append("+")
-                else:
-                    ret.append(" ")
-                continue
+        ret2 = "".join(ret)
+        if ret2 == val:
+            return val
+        return ret2
 
-            if ch in self._unsafe:
-                ret.append("%")
-                h = hex(ord(ch)).upper()[2:]
-                for ch in h:
-                    ret.append(ch)
+    def _unquote_pct_run(self, run: str) -> str:
+        try:
+            unquoted = bytes.fromhex(run.replace("%", "")).decode("utf8")
+        except UnicodeDecodeError:
+            # Keep the undecodable escapes as is, byte by byte
+            return self._unquote_pct_run_slow(run)
+        if self._decoded_table is not None:
+            unquoted = unquoted.translate(self._decoded_table)
+        return unquoted
+
+    def _unquote_pct_run_slow(self, run: str) -> str:
+        decoder = cast(codecs.BufferedIncrementalDecoder, utf8_decoder())
+        ret = []
+        for idx in range(0, len(run), 3):
+            b = bytes([int(run[idx + 1 : idx + 3], base=16)])
+            try:
+                unquoted = decoder.decode(b)
+            except UnicodeDecodeError:
+                start_pct = idx - len(decoder.buffer) * 3
+                ret.append(run[start_pct:idx])
+                decoder.reset()
+                try:
+                    unquoted = decoder.decode(b)
+                except UnicodeDecodeError:
+                    ret.append(run[idx : idx + 3])
+                    continue
+            if not unquoted:
                 continue
-
-            ret.append(ch)
+            if self._decoded_table is not None:
+                unquoted = unquoted.translate(self._decoded_table)
+            ret.append(unquoted)
 
         if decoder.buffer:
-            ret.append(val[-len(decoder.buffer) * 3 :])
+            ret.append(run[-len(decoder.buffer) * 3 :])
 
-        ret2 = "".join(ret)
-        if ret2 == val:
-            return val
-        return ret2
+        return "".join(ret)